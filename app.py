@@ -1,20 +1,20 @@
 import os
+import sys
 import csv
 import re
-import time
 import shutil
 import logging
 import boto3
 import configparser
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
+from instrumentation import Span, configure, export_prometheus
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_pipeline'))
+import B3_scrapping  # noqa: E402
 
 config = configparser.ConfigParser()
-config.read('config.ini')
+config.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'))
 
-URL_B3 = config.get("DEFAULT", "URL_B3")
 BUCKET_NAME = config.get("S3", "BUCKET_NAME")
 S3_PREFIX = config.get("S3", "S3_PREFIX")
 AWS_ACCESS_KEY_ID = config.get("S3", "AWS_ACCESS_KEY_ID")
@@ -28,8 +28,8 @@ logging.basicConfig(level=logging.INFO,
 date_pattern = re.compile(r"IBOVDia_(\d{2})-(\d{2})-(\d{2})\.csv")
 
 
-def prepare_data_folder():
-    data_folder = os.path.join(os.getcwd(), 'bovespa')
+def prepare_data_folder(data_folder=None):
+    data_folder = data_folder or os.path.join(os.getcwd(), 'bovespa')
 
     if not os.path.exists(data_folder):
         os.makedirs(data_folder)
@@ -47,32 +47,17 @@ def prepare_data_folder():
                 logging.exception(f"Erro ao remover {file_path}: {e}")
 
 
-def download_b3_latest_data():
-    options = Options()
-    prepare_data_folder()
-    current_path = os.getcwd()
-    download_path = os.path.join(current_path, "bovespa")
-    options.add_experimental_option("prefs", {
-        "download.default_directory": download_path,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
-    })
-
-    driver = webdriver.Chrome(options=options)
-    driver.get(URL_B3)
-    time.sleep(5)
-
-    try:
-        download_button = driver.find_element(By.LINK_TEXT, "Download")
-        download_button.click()
-        logging.info(
-            f"Realizando download dos dados da B3 em: {download_path}")
-        time.sleep(10)
-    except Exception as e:
-        logging.error(f"Erro ao baixar os dados: {e}")
-    finally:
-        driver.quit()
+def download_b3_latest_data(download_path=None):
+    download_path = download_path or os.path.join(os.getcwd(), "bovespa")
+    prepare_data_folder(download_path)
+    logging.info(f"Realizando download dos dados da B3 em: {download_path}")
+    # Índices e visões vêm da seção [INGEST] do config.ini; cada par é salvo
+    # em <download_path>/<INDICE>/<visao>
+    results = B3_scrapping.download_indices(download_path)
+    for (indice, view), file_path in results.items():
+        if file_path is None:
+            logging.error(f"Erro ao baixar os dados de {indice} ({view})")
+    return results
 
 
 def upload_to_s3(directory):
@@ -81,12 +66,17 @@ def upload_to_s3(directory):
                              aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
                              aws_session_token=AWS_SESSION_TOKEN,
                              region_name=AWS_REGION)
-    for filename in os.listdir(directory):
-        if filename.endswith(".csv"):
-            file_path = os.path.join(directory, filename)
-            s3_key = S3_PREFIX + filename
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if not filename.endswith(".csv"):
+                continue
+            file_path = os.path.join(root, filename)
+            # Mantém a pasta do índice/visão na chave: raw/IBOV/setor-de-atuacao/...
+            relative_path = os.path.relpath(file_path, directory).replace(os.sep, '/')
+            s3_key = S3_PREFIX + relative_path
             try:
-                s3_client.upload_file(file_path, BUCKET_NAME, s3_key)
+                with Span('upload', nbytes=os.path.getsize(file_path), file=relative_path):
+                    s3_client.upload_file(file_path, BUCKET_NAME, s3_key)
                 logging.info(
                     f"Arquivo {filename} enviado para s3://{BUCKET_NAME}/{s3_key}")
                 os.remove(file_path)
@@ -97,8 +87,12 @@ def upload_to_s3(directory):
 
 
 def main():
-    download_b3_latest_data()
-    upload_to_s3('./bovespa/')
+    configure('app')
+    try:
+        download_b3_latest_data()
+        upload_to_s3('./bovespa/')
+    finally:
+        export_prometheus()
 
 
 if __name__ == '__main__':
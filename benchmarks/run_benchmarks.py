@@ -0,0 +1,240 @@
+import os
+import sys
+import io
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import warnings
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data_pipeline'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'machine_learning'))
+
+import pipeline_util  # noqa: E402
+import regression_pipeline  # noqa: E402
+from synthetic_ibov import generate_ibov_files  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Escalas: (número de ações, número de pregões). A medium equivale a um ano do
+# IBOV e é a menor em que as etapas principais passam de --min-seconds; a small
+# serve para uma verificação rápida e só tem a memória comparada
+SCALES = {
+    'small': (30, 20),
+    'medium': (87, 250),
+    'large': (200, 250),
+}
+
+
+def dashboard_aggregations(df):
+    """Reproduz as agregações feitas pelo dashboard.py sobre o model_results.csv."""
+    df = df.copy()
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df['Erro_Absoluto'] = (df['Y_Predicted'] - df['Y_True']).abs()
+    df['Erro_Percentual'] = (df['Erro_Absoluto'] / df['Y_True']) * 100
+
+    df.groupby('Modelo')['Erro_Absoluto'].mean().idxmin()
+    for codigo in df['Codigo'].unique()[:10]:
+        df[df['Codigo'] == codigo].groupby('Modelo').agg({
+            'Y_True': 'mean',
+            'Y_Predicted': 'mean',
+            'Erro_Absoluto': 'mean',
+            'Erro_Percentual': 'mean',
+            'R²': 'mean'
+        })
+    df.sort_values('Date').groupby(['Codigo', 'Modelo']).last()
+    df.groupby('Modelo')['MAE'].mean()
+    df.nsmallest(3, 'MAE')
+    df.nlargest(3, 'MAE')
+    return df
+
+
+def _train(prepared):
+    X, y, dates, codes = prepared
+    return regression_pipeline.train_and_evaluate_models(X, y, regression_pipeline.build_models(), dates, codes)
+
+
+def _build_stages(files_pattern):
+    """Monta as etapas na ordem do fluxo; cada uma recebe a saída da anterior.
+
+    As features partem da saída de load_and_normalize_data, como no orchestrator.py;
+    load_data é medido à parte e a sua saída não é usada.
+    """
+    return [
+        ('load_data', lambda _: regression_pipeline.load_data(files_pattern)),
+        ('load_and_normalize_data', lambda _: pipeline_util.load_and_normalize_data(files_pattern)),
+        ('prepare_features', regression_pipeline.prepare_features),
+        ('train_and_evaluate_models', _train),
+        ('dashboard_aggregations', dashboard_aggregations),
+    ]
+
+
+def _measure(func, arg, repeat):
+    """Retorna o melhor tempo em `repeat` execuções e o pico de memória de uma execução.
+
+    O pico vem do tracemalloc e cobre só as alocações feitas pelo Python e pelo
+    numpy; a memória nativa do XGBoost no treino não entra na conta.
+    """
+    best = float('inf')
+    result = None
+    # Os prints e avisos das funções do pipeline poluiriam a saída do benchmark
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(arg)
+            best = min(best, time.perf_counter() - start)
+
+        # O tracemalloc deixa a execução mais lenta, por isso o pico é medido à parte
+        tracemalloc.start()
+        func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def calibrate(repeat=5):
+    """Mede uma carga fixa de pandas/numpy/Python para estimar a velocidade da máquina.
+
+    Os tempos de cada execução são divididos por este valor antes da comparação,
+    para que o baseline gravado em uma máquina valha em outra.
+    """
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'chave': rng.integers(0, 500, 200_000), 'valor': rng.random(200_000)})
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame.groupby('chave')['valor'].agg(['mean', 'sum', 'max'])
+        frame.sort_values('valor')
+        np.linalg.inv(rng.random((200, 200)))
+        sum(i * i for i in range(200_000))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_scale(name, n_tickers, n_days, repeat):
+    work_dir = tempfile.mkdtemp(prefix=f'bench_{name}_')
+    try:
+        generate_ibov_files(work_dir, n_tickers, n_days)
+        files_pattern = os.path.join(work_dir, '*.csv')
+
+        results = {'_calibration_seconds': round(calibrate(), 4)}
+        previous = None
+        for stage_name, func in _build_stages(files_pattern):
+            previous, seconds, peak = _measure(func, previous, repeat)
+            results[stage_name] = {'seconds': round(seconds, 4), 'python_peak_mb': round(peak / 2**20, 2)}
+            print(f"[{name}] {stage_name}: {seconds:.3f}s, pico Python {peak / 2**20:.1f} MB")
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare_with_baseline(current, baseline, time_tolerance, memory_tolerance, min_seconds):
+    """Lista as etapas que ficaram mais lentas ou usaram mais memória que o baseline.
+
+    Os tempos são normalizados pela calibração de cada escala. Etapas que levam
+    menos de min_seconds no baseline não têm o tempo verificado individualmente,
+    pois nelas o ruído da máquina é da mesma ordem da própria etapa; o tempo total
+    da escala é verificado com o mesmo limite. A memória é sempre verificada.
+    """
+    regressions = []
+    for scale, stages in current.items():
+        reference_stages = baseline.get(scale, {})
+        speed = reference_stages.get('_calibration_seconds', stages['_calibration_seconds'])
+        factor = speed / stages['_calibration_seconds']
+        total = reference_total = 0.0
+        for stage, metrics in stages.items():
+            reference = reference_stages.get(stage)
+            if stage.startswith('_') or reference is None:
+                continue
+            seconds = metrics['seconds'] * factor
+            total += seconds
+            reference_total += reference['seconds']
+            if reference['seconds'] >= min_seconds and seconds > reference['seconds'] * time_tolerance:
+                regressions.append(
+                    f"{scale}/{stage}: tempo normalizado {seconds:.3f}s > "
+                    f"{reference['seconds']:.3f}s x {time_tolerance}")
+            if metrics['python_peak_mb'] > reference['python_peak_mb'] * memory_tolerance:
+                regressions.append(
+                    f"{scale}/{stage}: memória {metrics['python_peak_mb']:.1f} MB > "
+                    f"{reference['python_peak_mb']:.1f} MB x {memory_tolerance}")
+        if reference_total >= min_seconds and total > reference_total * time_tolerance:
+            regressions.append(
+                f"{scale}/total: tempo normalizado {total:.3f}s > "
+                f"{reference_total:.3f}s x {time_tolerance}")
+    return regressions
+
+
+def _slowed_down(results, factor):
+    """Cópia dos resultados com todos os tempos multiplicados por factor."""
+    return {scale: {stage: dict(metrics, seconds=metrics['seconds'] * factor)
+                    if not stage.startswith('_') else metrics
+                    for stage, metrics in stages.items()}
+            for scale, stages in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark das etapas do pipeline com dados sintéticos.')
+    parser.add_argument('--scales', default='small,medium',
+                        help=f"Escalas separadas por vírgula ({', '.join(SCALES)})")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Grava os resultados como novo baseline')
+    parser.add_argument('--time-tolerance', type=float, default=1.5)
+    parser.add_argument('--memory-tolerance', type=float, default=1.25)
+    parser.add_argument('--min-seconds', type=float, default=0.5,
+                        help='Etapas mais rápidas que isso no baseline não têm o tempo verificado')
+    args = parser.parse_args()
+
+    current = {}
+    for name in args.scales.split(','):
+        n_tickers, n_days = SCALES[name]
+        current[name] = run_scale(name, n_tickers, n_days, args.repeat)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(current)
+        baseline['_environment'] = {'python': platform.python_version(), 'pandas': pd.__version__,
+                                    'machine': platform.machine()}
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False)
+        print(f"Baseline salvo em: {BASELINE_FILE}")
+        return
+
+    if not os.path.exists(BASELINE_FILE):
+        print("Nenhum baseline encontrado. Execute com --save-baseline.")
+        return
+
+    with open(BASELINE_FILE, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(current, baseline, args.time_tolerance, args.memory_tolerance,
+                                        args.min_seconds)
+    if regressions:
+        print("Regressões encontradas:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+
+    # Sem isso, um baseline em que nenhuma etapa passa de --min-seconds
+    # aprovaria qualquer lentidão
+    slowdown = args.time_tolerance * 2
+    if not compare_with_baseline(_slowed_down(current, slowdown), baseline, args.time_tolerance,
+                                 args.memory_tolerance, args.min_seconds):
+        print(f"A comparação não detectou uma lentidão simulada de {slowdown}x: "
+              f"nenhum tempo nas escalas {args.scales} passa de --min-seconds.")
+        sys.exit(1)
+    print("Nenhuma regressão em relação ao baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import os
+import random
+import string
+import argparse
+from datetime import date, timedelta
+
+# Cabeçalho idêntico ao dos arquivos baixados da B3 (sem o ';' final)
+HEADER = 'date;setor;codigo;acao;tipo;qtde_teorica;part_percent;part_acum_percent'
+
+# Setores no formato em que aparecem nos arquivos IBOVDia, com acentos,
+# espaços duplicados e variações de separador
+SETORES = [
+    'Bens Indls / Máqs e Equips',
+    'Bens Indls / Mat Transporte',
+    'Bens Indls/Transporte',
+    'Cons N  Básico / Alimentos Processados',
+    'Cons N Ciclico/Agropecuária',
+    'Cons N Cíclico / Bebidas',
+    'Cons N Cíclico / Comércio Distr.',
+    'Cons N Cíclico / Pr Pessoal Limp',
+    'Consumo Cíclico / Comércio',
+    'Consumo Cíclico / Tecid Vest Calç',
+    'Consumo Cíclico/Autos e Motos',
+    'Consumo Cíclico/Constr Civil',
+    'Consumo Cíclico/Viagens e Lazer',
+    'Diversos',
+    'Financ e Outros / Explor Imóveis',
+    'Financ e Outros / Holdings Divers',
+    'Financ e Outros / Interms Financs',
+    'Financ e Outros / Previd  Seguros',
+    'Financeiro e Outros/Serviços Financeiros Diversos',
+    'Mats Básicos / Madeira e Papel',
+    'Mats Básicos / Mineração',
+    'Mats Básicos / Químicos',
+    'Mats Básicos / Sid Metalurgia',
+    'Petróleo/ Gás e Biocombustíveis',
+    'Saúde/Comércio Distr.',
+    'Saúde/SM Hosp An.Diag',
+    'Tec.Informação/Programas Servs',
+    'Telecomunicação',
+    'Utilidade Públ / Energ Elétrica',
+    'Utilidade Públ / Água Saneamento',
+]
+
+# Tipos de ação com o espaçamento fixo usado pela B3
+TIPOS = [
+    ('ON      NM', '3'),
+    ('ON      N1', '3'),
+    ('ON      N2', '3'),
+    ('ON  ED  NM', '3'),
+    ('PN      N1', '4'),
+    ('PN      N2', '4'),
+    ('PNA     N1', '5'),
+    ('PNB     N1', '6'),
+    ('UNT     N2', '11'),
+]
+
+PALAVRAS = ['BRASIL', 'ENERGIA', 'PARTICIP', 'HOLDING', 'S.A.', 'SA', 'GRUPO',
+            'INDUSTRIA', 'COMERCIO', 'SANEAMENTO', 'SEGUROS', 'LOG']
+
+
+def _trading_days(start, n_days):
+    """Gera os próximos n_days dias úteis (seg-sex) a partir de start."""
+    days = []
+    current = start
+    while len(days) < n_days:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+def _build_tickers(n_tickers, rng):
+    """Cria a carteira teórica: setor, código, nome, tipo e quantidade."""
+    tickers = []
+    used_codes = set()
+    for i in range(n_tickers):
+        tipo, suffix = rng.choice(TIPOS)
+        while True:
+            root = ''.join(rng.choice(string.ascii_uppercase) for _ in range(4))
+            codigo = root + suffix
+            if codigo not in used_codes:
+                used_codes.add(codigo)
+                break
+        acao = root
+        if rng.random() < 0.5:
+            acao = f"{root} {rng.choice(PALAVRAS)}"
+        tickers.append({
+            'setor': SETORES[i] if i < len(SETORES) else rng.choice(SETORES),
+            'codigo': codigo,
+            'acao': acao,
+            'tipo': tipo,
+            'qtde_teorica': float(rng.randint(50_000_000, 5_000_000_000)),
+            'peso': rng.lognormvariate(0, 1),
+        })
+    # Os arquivos da B3 vêm ordenados por setor
+    tickers.sort(key=lambda t: t['setor'])
+    return tickers
+
+
+def _format_day(day, tickers, trailing_semicolon):
+    """Monta as linhas de um arquivo IBOVDia para um pregão."""
+    total = sum(t['peso'] for t in tickers)
+    parts = [round(t['peso'] / total * 100, 3) for t in tickers]
+
+    acum_por_setor = {}
+    for ticker, part in zip(tickers, parts):
+        acum_por_setor[ticker['setor']] = acum_por_setor.get(ticker['setor'], 0.0) + part
+
+    # Nos arquivos originais cada linha de dados termina com ';', mas o cabeçalho não
+    end = ';' if trailing_semicolon else ''
+    lines = [HEADER]
+    date_str = day.strftime('%Y-%m-%d')
+    for ticker, part in zip(tickers, parts):
+        lines.append(
+            f"{date_str};{ticker['setor']};{ticker['codigo']};{ticker['acao']};"
+            f"{ticker['tipo']};{ticker['qtde_teorica']};{part:.3f};"
+            f"{acum_por_setor[ticker['setor']]:.3f}{end}")
+    return '\n'.join(lines) + '\n'
+
+
+def generate_ibov_files(output_dir, n_tickers, n_days, start=date(2025, 1, 2), seed=42,
+                        trailing_semicolon=True):
+    """Gera n_days arquivos IBOVDia_dd-mm-yy.csv com n_tickers ações cada.
+
+    Os pesos de participação seguem um passeio aleatório entre os pregões
+    para que as séries tenham variação realista de um dia para o outro.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    tickers = _build_tickers(n_tickers, rng)
+
+    files = []
+    for day in _trading_days(start, n_days):
+        for ticker in tickers:
+            ticker['peso'] *= rng.lognormvariate(0, 0.02)
+        file_path = os.path.join(output_dir, f"IBOVDia_{day.strftime('%d-%m-%y')}.csv")
+        with open(file_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(_format_day(day, tickers, trailing_semicolon))
+        files.append(file_path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera arquivos sintéticos no formato IBOVDia.')
+    parser.add_argument('output_dir')
+    parser.add_argument('--tickers', type=int, default=87)
+    parser.add_argument('--days', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-trailing-semicolon', action='store_true',
+                        help="Não adiciona o ';' no final das linhas de dados")
+    args = parser.parse_args()
+
+    files = generate_ibov_files(args.output_dir, args.tickers, args.days, seed=args.seed,
+                                trailing_semicolon=not args.no_trailing_semicolon)
+    print(f"{len(files)} arquivos gerados em: {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import os
 
 # Configurações da página
 st.set_page_config(
@@ -15,7 +16,8 @@ st.set_page_config(
 # Função para carregar os dados com cache
 @st.cache_data
 def load_data():
-    file_path = r'C:\Users\vfanj\Documents\FIAP_POS_ML\Fase03_Tech_Challenge\bovespa-data-analysis\bovespa-data-analysis\resultados\model_results.csv'
+    # Arquivo gerado pela etapa 'results' do orchestrator.py
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados', 'model_results.csv')
     df = pd.read_csv(file_path)
     
     # Transformações
@@ -1,19 +1,42 @@
 import os
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
+import sys
 import time
+import queue
 import shutil
 import logging
+import threading
+import unicodedata
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from instrumentation import Span  # noqa: E402
+
+config = configparser.ConfigParser()
+config.read(os.path.join(ROOT_DIR, 'config.ini'))
 
-URL_B3 = "https://sistemaswebb3-listados.b3.com.br/indexPage/day/IBOV?language=pt-br"
+URL_TEMPLATE = config.get('INGEST', 'URL_TEMPLATE',
+                          fallback='https://sistemaswebb3-listados.b3.com.br/indexPage/day/{indice}?language=pt-br')
+INDICES = [i.strip() for i in config.get('INGEST', 'INDICES', fallback='IBOV').split(',') if i.strip()]
+VIEWS = [v.strip() for v in config.get('INGEST', 'VIEWS', fallback='Setor de Atuação').split(',') if v.strip()]
+MAX_SESSIONS = config.getint('INGEST', 'MAX_SESSIONS', fallback=3)
+HEADLESS = config.getboolean('INGEST', 'HEADLESS', fallback=True)
+PAGE_TIMEOUT = config.getint('INGEST', 'PAGE_TIMEOUT', fallback=20)
+VIEW_DELAY = config.getint('INGEST', 'VIEW_DELAY', fallback=5)
+DOWNLOAD_TIMEOUT = config.getint('INGEST', 'DOWNLOAD_TIMEOUT', fallback=30)
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def prepare_data_folder():
-    data_folder = os.path.join(os.getcwd(), 'bovespa')
+def prepare_data_folder(data_folder=None):
+    data_folder = data_folder or os.path.join(os.getcwd(), 'bovespa')
 
     if not os.path.exists(data_folder):  # Create data folder if it doesn't exist
         os.makedirs(data_folder)
@@ -32,39 +55,179 @@ def prepare_data_folder():
                 logging.exception(f"Erro ao remover {file_path}: {e}")
 
 
-def download_b3_latest_data():
-    options = Options()
+def view_slug(view):
+    """Nome de pasta para a visão: 'Setor de Atuação' -> 'setor-de-atuacao'."""
+    ascii_view = unicodedata.normalize('NFKD', view).encode('ascii', 'ignore').decode('ascii')
+    return '-'.join(ascii_view.lower().split())
+
+
+def output_folder(base_path, indice, view):
+    """Pasta de saída de cada índice e visão: <base>/<INDICE>/<visao>."""
+    return os.path.join(base_path, indice, view_slug(view))
+
+
+class BrowserPool:
+    """Pool de sessões do Chrome reaproveitadas entre os downloads.
+
+    As sessões são criadas sob demanda até max_sessions, para que o custo de
+    abrir o navegador seja pago uma vez por sessão e não uma vez por índice.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, headless=HEADLESS):
+        self.max_sessions = max_sessions
+        self.headless = headless
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_driver(self):
+        options = Options()
+        if self.headless:
+            options.add_argument('--headless=new')
+        options.add_experimental_option("prefs", {
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "safebrowsing.enabled": True
+        })
+        with Span('browser_start'):
+            return webdriver.Chrome(options=options)
+
+    def acquire(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                can_create = self._created < self.max_sessions
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return self._new_driver()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            # Pool cheio: espera uma sessão ser devolvida ou uma vaga ser liberada
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def release(self, driver, broken=False):
+        if broken:
+            # Sessão em estado desconhecido: descarta e libera a vaga no pool
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(driver)
+
+    def close(self):
+        while not self._idle.empty():
+            driver = self._idle.get_nowait()
+            # Uma sessão que falhe ao fechar não deve impedir o fechamento das outras
+            try:
+                driver.quit()
+            except Exception as e:
+                logging.error(f"Erro ao fechar o navegador: {e}")
+        self._created = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _wait_for_download(folder, existing, timeout):
+    """Espera até aparecer na pasta um .csv completo que não está em existing."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        names = os.listdir(folder)
+        new_files = [f for f in names if f.endswith('.csv') and f not in existing]
+        partial = [f for f in names if f.endswith('.crdownload')]
+        if new_files and not partial:
+            return os.path.join(folder, new_files[0])
+        time.sleep(0.5)
+    raise TimeoutError(f"Download não concluído em {timeout}s: {folder}")
 
-    prepare_data_folder()  # Prepare data folder
-    current_path = os.getcwd()
-    download_path = os.path.join(current_path, "bovespa")
-    options.add_experimental_option("prefs", {
-        "download.default_directory": download_path,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
+
+def download_index(driver, indice, view, base_path):
+    """Baixa o arquivo de um índice em uma visão usando uma sessão já aberta."""
+    folder = output_folder(base_path, indice, view)
+    os.makedirs(folder, exist_ok=True)
+    # Cada sessão é um Chrome próprio, então a pasta de download vale só para ela
+    driver.execute_cdp_cmd('Browser.setDownloadBehavior', {
+        'behavior': 'allow',
+        'downloadPath': folder
     })
 
-    driver = webdriver.Chrome(options=options)
-    driver.get(URL_B3)
-    time.sleep(5)
+    with Span('download', index=indice, view=view) as span:
+        driver.get(URL_TEMPLATE.format(indice=indice))
+        wait = WebDriverWait(driver, PAGE_TIMEOUT)
+
+        search_button = wait.until(EC.presence_of_element_located(
+            (By.ID, "segment")))  # Search for the view, e.g. "Setor de Atuação"
+        search_button.send_keys(view)
+        time.sleep(VIEW_DELAY)
 
-    search_button = driver.find_element(
-        By.ID, "segment")  # Search for "Setor de Atuação"
-    search_button.send_keys("Setor de Atuação")
-    time.sleep(5)
+        download_button = wait.until(EC.element_to_be_clickable(
+            (By.LINK_TEXT, "Download")))  # Download the data
+        # A pasta pode já ter o histórico de dias anteriores
+        existing = set(os.listdir(folder))
+        download_button.click()
+        logging.info(f"Realizando download de {indice} ({view}) em: {folder}")
+
+        file_path = _wait_for_download(folder, existing, DOWNLOAD_TIMEOUT)
+        span.nbytes = os.path.getsize(file_path)
+    return file_path
+
+
+def download_indices(base_path, indices=None, views=None, max_sessions=MAX_SESSIONS):
+    """Baixa todos os pares índice/visão em paralelo, limitado a max_sessions navegadores.
+
+    Retorna um dicionário (índice, visão) -> caminho do arquivo, ou None em caso de erro.
+    """
+    jobs = [(indice, view) for indice in (indices or INDICES) for view in (views or VIEWS)]
+    results = {}
+    if not jobs:
+        logging.warning("Nenhum índice ou visão configurado na seção [INGEST] do config.ini.")
+        return results
+
+    with BrowserPool(max_sessions=max(1, min(max_sessions, len(jobs)))) as pool:
+        def run(job):
+            indice, view = job
+            try:
+                driver = pool.acquire()
+            except Exception as e:
+                logging.error(f"Erro ao abrir o navegador para {indice} ({view}): {e}")
+                return None
+            try:
+                file_path = download_index(driver, indice, view, base_path)
+            except Exception as e:
+                logging.error(f"Erro ao baixar {indice} ({view}): {e}")
+                pool.release(driver, broken=True)
+                return None
+            pool.release(driver)
+            return file_path
 
-    download_button = driver.find_element(
-        By.LINK_TEXT, "Download")  # Download the data
-    download_button.click()
-    logging.info(f"Realizando download dos dados da B3 em: {download_path}")
-    time.sleep(5)
-    driver.quit()
+        with ThreadPoolExecutor(max_workers=pool.max_sessions) as executor:
+            for job, file_path in zip(jobs, executor.map(run, jobs)):
+                results[job] = file_path
+    return results
 
 
 def main():
-    download_b3_latest_data()  # Download the latest data from B3
+    download_path = os.path.join(os.getcwd(), "bovespa")
+    prepare_data_folder(download_path)  # Prepare data folder
+    download_indices(download_path)  # Download the latest data from B3
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
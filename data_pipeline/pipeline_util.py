@@ -2,6 +2,10 @@ import pandas as pd
 import glob
 import unidecode
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import Span, configure, export_prometheus
 
 def load_and_normalize_data(file_path_pattern):
     """Carrega e normaliza os dados de múltiplos arquivos CSV."""
@@ -14,7 +18,11 @@ def load_and_normalize_data(file_path_pattern):
         try:
             print(f"Lendo arquivo: {file}")
             # Ler o arquivo com o delimitador correto e forçar a leitura da coluna 'date' como texto
-            df = pd.read_csv(file, delimiter=';', dtype={'date': str}, quotechar='"')
+            with Span('parse', nbytes=os.path.getsize(file), file=os.path.basename(file)) as span:
+                # index_col=False: as linhas de dados terminam com ';' e, sem isso, o pandas
+                # usaria a coluna 'date' como índice e deslocaria as demais colunas
+                df = pd.read_csv(file, delimiter=';', dtype={'date': str}, quotechar='"', index_col=False)
+                span.rows = len(df)
             
             # Verificar se os cabeçalhos estão corretos
             expected_headers = ['date', 'setor', 'codigo', 'acao', 'tipo', 'qtde_teorica', 'part_percent', 'part_acum_percent']
@@ -22,18 +30,22 @@ def load_and_normalize_data(file_path_pattern):
                 print(f"Erro: Cabeçalhos incorretos ou faltando no arquivo {file}")
                 continue
 
-            # Converter a coluna 'date' para o formato datetime
-            df['date'] = pd.to_datetime(df['date'], format="%Y-%m-%d", errors="coerce")
+            with Span('normalize', rows=len(df), file=os.path.basename(file)):
+                # Converter a coluna 'date' para o formato datetime; alguns arquivos
+                # da B3 vêm com a data no formato DD/MM/YYYY
+                raw_dates = df['date']
+                df['date'] = pd.to_datetime(raw_dates, format="%Y-%m-%d", errors="coerce")
+                df['date'] = df['date'].fillna(pd.to_datetime(raw_dates, format="%d/%m/%Y", errors="coerce"))
             
-            # Preencher valores ausentes na coluna 'date' com o valor da linha anterior
-            df['date'] = df['date'].fillna(method='ffill')
+                # Preencher valores ausentes na coluna 'date' com o valor da linha anterior
+                df['date'] = df['date'].fillna(method='ffill')
             
-            # Preencher valores ausentes na coluna 'setor' com o valor da linha anterior
-            df['setor'] = df['setor'].fillna(method='ffill')
+                # Preencher valores ausentes na coluna 'setor' com o valor da linha anterior
+                df['setor'] = df['setor'].fillna(method='ffill')
             
-            # Normalizar setores
-            df['setor'] = df['setor'].apply(lambda x: unidecode.unidecode(x).title() if isinstance(x, str) else x)
-            df['setor'] = df['setor'].str.replace(r'[^a-zA-Z0-9 /]', '', regex=True)
+                # Normalizar setores
+                df['setor'] = df['setor'].apply(lambda x: unidecode.unidecode(x).title() if isinstance(x, str) else x)
+                df['setor'] = df['setor'].str.replace(r'[^a-zA-Z0-9 /]', '', regex=True)
 
             df_list.append(df)
             processed_files.append(file)
@@ -79,12 +91,14 @@ def main():
     input_path_pattern = '../01_elt_etl/bovespa/*.csv'
     output_file = 'consolidated_data.csv'
     
+    configure('pipeline_util')
     data = load_and_normalize_data(input_path_pattern)
     if not data.empty:
         print("Amostra dos dados consolidados:")
         print(data.head())
     
     save_incremental_data(data, output_file)
+    export_prometheus()
 
 
 if __name__ == '__main__':
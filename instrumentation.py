@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import logging
+import functools
+import threading
+import configparser
+from datetime import datetime
+
+import psutil
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Destinos das métricas; ficam desligados até configure() ser chamado
+_job = None
+_jsonl_path = None
+_prometheus_path = None
+
+# Agregado por etapa e labels usado na exportação para o Prometheus
+_stage_totals = {}
+# Resultado de cada etapa do orchestrator: nome -> (status, último sucesso)
+_dag_status = {}
+_lock = threading.Lock()
+
+# Labels de baixa cardinalidade exportados para o Prometheus; os demais
+# (ex.: file) ficam apenas no JSONL
+PROMETHEUS_LABELS = ('model', 'index', 'view')
+
+DAG_STATUSES = ('ok', 'skipped', 'failed', 'blocked')
+
+# Intervalo entre as leituras de RSS feitas enquanto um Span está aberto
+RSS_SAMPLE_INTERVAL = 0.01
+
+
+def configure(job, jsonl_path=None, prometheus_dir=None):
+    """Define onde as métricas do ponto de entrada `job` serão gravadas.
+
+    Cada job grava o seu próprio arquivo <prometheus_dir>/b3_pipeline_<job>.prom,
+    para que a execução de um script não apague as séries de outro; o
+    node_exporter lê todos os *.prom da pasta. Sem caminhos, usa a seção
+    [METRICS] do config.ini. Caminhos relativos partem da raiz do projeto.
+    """
+    global _job, _jsonl_path, _prometheus_path
+    if jsonl_path is None and prometheus_dir is None:
+        config = configparser.ConfigParser()
+        config.read(os.path.join(ROOT_DIR, 'config.ini'))
+        jsonl_path = config.get('METRICS', 'JSONL_PATH', fallback='metrics/pipeline_metrics.jsonl')
+        prometheus_dir = config.get('METRICS', 'PROMETHEUS_DIR', fallback='metrics')
+
+    _job = job
+    _jsonl_path = os.path.join(ROOT_DIR, jsonl_path) if jsonl_path else None
+    _prometheus_path = (os.path.join(ROOT_DIR, prometheus_dir, f'b3_pipeline_{job}.prom')
+                        if prometheus_dir else None)
+    for path in (_jsonl_path, _prometheus_path):
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+class _RssSampler(threading.Thread):
+    """Lê o RSS do processo em intervalos fixos enquanto um Span está aberto."""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self._process = psutil.Process()
+        self._stop_event = threading.Event()
+        self.start_bytes = self._process.memory_info().rss
+        self.peak_bytes = self.start_bytes
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, self._process.memory_info().rss)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        # Leitura final para spans mais curtos que o intervalo
+        self.peak_bytes = max(self.peak_bytes, self._process.memory_info().rss)
+
+
+class Span:
+    """Mede uma etapa do pipeline: tempo, linhas, bytes e RSS durante a etapa.
+
+    O RSS é do processo inteiro: spans abertos ao mesmo tempo em outras threads
+    (ex.: treino paralelo dos modelos) também contam no pico uns dos outros.
+
+    Uso:
+        with Span('parse', file=file) as span:
+            df = pd.read_csv(file)
+            span.rows = len(df)
+    """
+
+    def __init__(self, name, rows=None, nbytes=None, **labels):
+        self.name = name
+        self.rows = rows
+        self.nbytes = nbytes
+        self.labels = labels
+        self.seconds = None
+        self.rss_start_bytes = None
+        self.rss_peak_bytes = None
+
+    def __enter__(self):
+        self._sampler = _RssSampler()
+        self._sampler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start
+        self._sampler.stop()
+        self.rss_start_bytes = self._sampler.start_bytes
+        self.rss_peak_bytes = self._sampler.peak_bytes
+        _record(self, 'error' if exc_type else 'ok')
+        return False
+
+
+def timed(name, **labels):
+    """Decorator que envolve a função em um Span; usa len() do retorno como linhas."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(name, **labels) as span:
+                result = func(*args, **kwargs)
+                if hasattr(result, '__len__'):
+                    span.rows = len(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def _record(span, status):
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'job': _job,
+        'stage': span.name,
+        'status': status,
+        'seconds': round(span.seconds, 6),
+        'rows': span.rows,
+        'rows_per_second': round(span.rows / span.seconds, 2) if span.rows and span.seconds else None,
+        'bytes': span.nbytes,
+        # Maior RSS lido durante o span e quanto ele cresceu desde o início do span
+        'rss_peak_bytes': span.rss_peak_bytes,
+        'rss_growth_bytes': span.rss_peak_bytes - span.rss_start_bytes,
+    }
+    record.update(span.labels)
+
+    key = (span.name,) + tuple((label, str(span.labels[label]))
+                               for label in PROMETHEUS_LABELS if label in span.labels)
+    line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+
+    # Spans são fechados em paralelo pelo treino dos modelos e pelo pool de navegadores
+    with _lock:
+        totals = _stage_totals.setdefault(key, {
+            'runs': 0, 'errors': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0, 'rss_peak_bytes': 0,
+            'rss_growth_bytes': 0, 'last_success': None})
+        totals['runs'] += 1
+        totals['seconds'] += span.seconds
+        totals['rows'] += span.rows or 0
+        totals['bytes'] += span.nbytes or 0
+        totals['rss_peak_bytes'] = max(totals['rss_peak_bytes'], record['rss_peak_bytes'])
+        totals['rss_growth_bytes'] = max(totals['rss_growth_bytes'], record['rss_growth_bytes'])
+        if status == 'ok':
+            totals['last_success'] = time.time()
+        else:
+            totals['errors'] += 1
+
+        if _jsonl_path:
+            try:
+                with open(_jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError as e:
+                logging.error(f"Erro ao gravar métricas em {_jsonl_path}: {e}")
+
+    logging.debug(f"Etapa {span.name} ({status}): {span.seconds:.3f}s, linhas={span.rows}")
+
+
+def record_dag_status(stage, status, last_success=None):
+    """Registra o resultado de uma etapa do orchestrator para a exportação.
+
+    last_success vem do estado do orchestrator, então etapas puladas continuam
+    exportando o horário da última execução bem-sucedida.
+    """
+    with _lock:
+        _dag_status[stage] = (status, last_success)
+
+
+def _prometheus_labels(pairs):
+    pairs = [('job', _job or 'unknown')] + list(pairs)
+    escaped = [(name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for name, value in pairs]
+    return ','.join(f'{name}="{value}"' for name, value in escaped)
+
+
+def export_prometheus(path=None):
+    """Grava os totais por etapa no formato do textfile collector do node_exporter.
+
+    O arquivo do job é reescrito mesmo sem nenhuma etapa medida, para que valores
+    de execuções anteriores não fiquem para trás; no orchestrator, o status e o
+    último sucesso de cada etapa do DAG são exportados mesmo quando ela é pulada.
+    """
+    path = path or _prometheus_path
+    if not path:
+        return
+
+    with _lock:
+        snapshot = sorted(((key, dict(totals)) for key, totals in _stage_totals.items()),
+                          key=lambda item: item[0])
+        dag_snapshot = sorted(_dag_status.items())
+
+    metrics = [
+        ('b3_pipeline_stage_runs_total', 'counter', 'Execuções da etapa', 'runs'),
+        ('b3_pipeline_stage_errors_total', 'counter', 'Execuções da etapa com erro', 'errors'),
+        ('b3_pipeline_stage_duration_seconds', 'gauge', 'Tempo total da etapa na última execução do pipeline', 'seconds'),
+        ('b3_pipeline_stage_rows', 'gauge', 'Linhas processadas pela etapa', 'rows'),
+        ('b3_pipeline_stage_bytes', 'gauge', 'Bytes processados pela etapa', 'bytes'),
+        ('b3_pipeline_stage_rss_peak_bytes', 'gauge', 'Maior RSS do processo lido durante a etapa', 'rss_peak_bytes'),
+        ('b3_pipeline_stage_rss_growth_bytes', 'gauge', 'Maior crescimento do RSS entre o início da etapa e o pico', 'rss_growth_bytes'),
+        ('b3_pipeline_stage_last_success_timestamp_seconds', 'gauge', 'Horário do último sucesso da etapa', 'last_success'),
+    ]
+    lines = []
+    for metric, metric_type, help_text, key in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for (stage, *labels), totals in snapshot:
+            if totals[key] is not None:
+                lines.append(f'{metric}{{{_prometheus_labels([("stage", stage)] + labels)}}} {totals[key]}')
+
+    if dag_snapshot:
+        lines.append("# HELP b3_pipeline_dag_stage_status Resultado da etapa do DAG na última execução (1 = status atual)")
+        lines.append("# TYPE b3_pipeline_dag_stage_status gauge")
+        for stage, (status, _) in dag_snapshot:
+            for candidate in DAG_STATUSES:
+                labels = _prometheus_labels([('stage', stage), ('status', candidate)])
+                lines.append(f'b3_pipeline_dag_stage_status{{{labels}}} {int(candidate == status)}')
+        lines.append("# HELP b3_pipeline_dag_stage_last_success_timestamp_seconds Horário do último sucesso da etapa do DAG, inclusive de execuções anteriores")
+        lines.append("# TYPE b3_pipeline_dag_stage_last_success_timestamp_seconds gauge")
+        for stage, (_, last_success) in dag_snapshot:
+            if last_success is not None:
+                lines.append(f'b3_pipeline_dag_stage_last_success_timestamp_seconds{{{_prometheus_labels([("stage", stage)])}}} {last_success}')
+
+    # Escrita atômica para o collector nunca ler um arquivo pela metade
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.error(f"Erro ao gravar métricas em {path}: {e}")
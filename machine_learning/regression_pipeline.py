@@ -1,13 +1,25 @@
 import pandas as pd
 import numpy as np
 import glob
+import os
+import sys
 import unidecode
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error, mean_absolute_percentage_error
+from sklearn.linear_model import LinearRegression, Ridge, Lasso
+from sklearn.tree import DecisionTreeRegressor
+from xgboost import XGBRegressor
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import Span, timed, configure, export_prometheus
+
+@timed('load')
 def load_data(file_path_pattern):
     all_files = glob.glob(file_path_pattern)
     df_list = []
     for file in all_files:
-        df = pd.read_csv(file, delimiter=';')
+        # index_col=False: as linhas de dados da B3 terminam com ';' (ver pipeline_util)
+        df = pd.read_csv(file, delimiter=';', index_col=False)
         df_list.append(df)
     return pd.concat(df_list, ignore_index=True)
 
@@ -33,19 +45,81 @@ def normalize_sectors(data):
     return data
 
 def preprocess_data(data):
-    data = normalize_sectors(data)
+    with Span('sector_mapping', rows=len(data)):
+        data = normalize_sectors(data)
     # Gerar dummies após a limpeza
-    data = pd.get_dummies(data, columns=['setor', 'codigo', 'acao', 'tipo'])
+    with Span('encoding', rows=len(data)):
+        data = pd.get_dummies(data, columns=['setor', 'codigo', 'acao', 'tipo'])
     return data
 
+def prepare_features(data):
+    # Separar datas e códigos antes dos dummies. Usa o preprocess_data deste
+    # módulo (dummies de setor/codigo/acao/tipo), não o pré-processamento do
+    # notebook (LabelEncoder, imputação e remoção de outliers)
+    dates = data['date']
+    codes = data['codigo']
+    data = preprocess_data(data.copy())
+    X = data.drop(columns=['part_percent', 'date']).fillna(0)
+    y = data['part_percent']
+    return X, y, dates, codes
+
+def build_models():
+    # Mesmos modelos usados no regression_notebook.ipynb
+    return {
+        'linear': LinearRegression(),
+        'ridge': Ridge(alpha=1.0),
+        'lasso': Lasso(alpha=0.1),
+        'decision_tree': DecisionTreeRegressor(random_state=42),
+        'xgboost': XGBRegressor(random_state=42)
+    }
+
+def train_and_evaluate_models(X, y, models, dates, codes):
+    results_list = []
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    test_dates = dates.iloc[X_test.index]
+    test_codes = codes.iloc[X_test.index]
+
+    for model_name, model in models.items():
+        with Span('fit', rows=len(X_train), model=model_name):
+            model.fit(X_train, y_train)
+        with Span('predict', rows=len(X_test), model=model_name):
+            y_pred = model.predict(X_test)
+
+        mse = mean_squared_error(y_test, y_pred)
+        r2 = r2_score(y_test, y_pred)
+        mae = mean_absolute_error(y_test, y_pred)
+        mape = mean_absolute_percentage_error(y_test, y_pred)
+
+        for i in range(len(y_pred)):
+            results = {
+                'Modelo': model_name,
+                'Date': test_dates.iloc[i],
+                'Codigo': test_codes.iloc[i],
+                'Y_Predicted': y_pred[i],
+                'Y_True': y_test.iloc[i],
+                'MSE': mse,
+                'R²': r2,
+                'MAE': mae,
+                'MAPE': mape
+            }
+            results_list.append(results)
+
+    # Reordenar as colunas para que 'Modelo' venha após 'Date'
+    columns_order = ['Date', 'Modelo', 'Codigo', 'Y_Predicted', 'Y_True', 'MSE', 'R²', 'MAE', 'MAPE']
+    return pd.DataFrame(results_list)[columns_order]
+
 def main():
-    data = load_data('../01_elt_etl/bovespa/*.csv')
-    data = preprocess_data(data)
-    if data.empty:
-        raise ValueError("Não há dados válidos para processar após a pré-processamento.")
-    # Salvar dados limpos para verificação
-    data.to_csv('cleaned_data.csv', index=False)
-    print("Dados foram limpos e salvos com sucesso.")
+    configure('regression_pipeline')
+    try:
+        data = load_data('../01_elt_etl/bovespa/*.csv')
+        data = preprocess_data(data)
+        if data.empty:
+            raise ValueError("Não há dados válidos para processar após a pré-processamento.")
+        # Salvar dados limpos para verificação
+        data.to_csv('cleaned_data.csv', index=False)
+        print("Dados foram limpos e salvos com sucesso.")
+    finally:
+        export_prometheus()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,317 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import logging
+import argparse
+import threading
+import configparser
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT_DIR, 'data_pipeline'))
+sys.path.append(os.path.join(ROOT_DIR, 'machine_learning'))
+
+import pipeline_util  # noqa: E402
+import regression_pipeline  # noqa: E402
+import B3_scrapping  # noqa: E402
+from instrumentation import Span, configure, export_prometheus, record_dag_status  # noqa: E402
+
+config = configparser.ConfigParser()
+config.read(os.path.join(ROOT_DIR, 'config.ini'))
+
+STATE_FILE = os.path.join(ROOT_DIR, config.get('PIPELINE', 'STATE_FILE', fallback='.pipeline_state.json'))
+CACHE_DIR = os.path.join(ROOT_DIR, config.get('PIPELINE', 'CACHE_DIR', fallback='.pipeline_cache'))
+MAX_WORKERS = config.getint('PIPELINE', 'MAX_WORKERS', fallback=4)
+TRAINING_INDEX = config.get('PIPELINE', 'TRAINING_INDEX', fallback='IBOV')
+TRAINING_VIEW = config.get('PIPELINE', 'TRAINING_VIEW', fallback='Setor de Atuação')
+
+DATA_DIR = os.path.join(ROOT_DIR, 'data_pipeline', 'bovespa')
+STAGING_DIR = os.path.join(ROOT_DIR, 'data_pipeline', 'staging')
+TRAINING_DIR = B3_scrapping.output_folder(DATA_DIR, TRAINING_INDEX, TRAINING_VIEW)
+CONSOLIDATED_FILE = os.path.join(CACHE_DIR, 'consolidated_data.csv')
+FEATURES_FILE = os.path.join(CACHE_DIR, 'features.pkl')
+RESULTS_FILE = os.path.join(ROOT_DIR, 'resultados', 'model_results.csv')
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class Stage:
+    """Etapa do DAG.
+
+    O fingerprint combina o código da etapa, o conteúdo dos arquivos de entrada
+    e os parâmetros. Se for igual ao da última execução bem-sucedida e as saídas
+    existirem, a etapa é pulada.
+    """
+
+    def __init__(self, name, func, args=(), deps=(), inputs=(), outputs=(), code=(), params=None):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+        self.params = params or {}
+
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        digest.update(inspect.getsource(self.func).encode('utf-8'))
+        for path in self.code:
+            digest.update(_file_hash(os.path.join(ROOT_DIR, path)).encode('utf-8'))
+        for pattern in self.inputs:
+            for path in sorted(glob.glob(pattern)):
+                digest.update(os.path.relpath(path, ROOT_DIR).encode('utf-8'))
+                digest.update(_file_hash(path).encode('utf-8'))
+        digest.update(json.dumps([self.args, self.params], sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def outputs_exist(self):
+        return all(os.path.exists(path) for path in self.outputs)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Etapas
+
+def download_stage():
+    # Importado aqui porque o app.py lê as credenciais do S3 ao ser carregado
+    import app
+
+    # Cada execução baixa em uma subpasta própria: download_b3_latest_data limpa a
+    # pasta de destino, e arquivos de dias anteriores ainda não enviados ao S3
+    # precisam continuar em staging até o upload ser refeito
+    run_dir = os.path.join(STAGING_DIR, datetime.now().strftime('%Y%m%d-%H%M%S-%f'))
+    # Todos os índices e visões são baixados de uma vez pelo pool de navegadores
+    results = app.download_b3_latest_data(run_dir)
+    failed = [f"{indice} ({view})" for (indice, view), file_path in results.items() if file_path is None]
+    if failed:
+        # Falha a etapa para que o download seja refeito na próxima execução,
+        # em vez de ficar registrado como concluído até o dia seguinte
+        shutil.rmtree(run_dir, ignore_errors=True)
+        raise RuntimeError(f"Falha no download de: {', '.join(failed)}")
+    shutil.copytree(run_dir, DATA_DIR, dirs_exist_ok=True)
+    logging.info(f"Arquivos de {run_dir} copiados para {DATA_DIR}")
+
+
+def _staged_files(folder=STAGING_DIR):
+    return glob.glob(os.path.join(folder, '**', '*.csv'), recursive=True)
+
+
+def upload_stage():
+    if not _staged_files():
+        logging.info("Nenhum arquivo novo para enviar ao S3.")
+        return
+
+    import app
+
+    # Envia cada execução separadamente para a chave no S3 começar no índice
+    # (raw/IBOV/...) e não no nome da subpasta da execução
+    for run_dir in sorted(glob.glob(os.path.join(STAGING_DIR, '*', ''))):
+        if not _staged_files(run_dir):
+            continue
+        app.upload_to_s3(run_dir)
+        # upload_to_s3 só registra os erros; arquivos enviados são removidos da pasta
+        if not _staged_files(run_dir):
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    remaining = _staged_files()
+    if remaining:
+        raise RuntimeError(f"{len(remaining)} arquivo(s) não foram enviados ao S3: {remaining}")
+
+
+def normalize_stage():
+    data = pipeline_util.load_and_normalize_data(os.path.join(TRAINING_DIR, '*.csv'))
+    if data.empty:
+        raise ValueError("Nenhum arquivo foi processado.")
+    if data['date'].isna().all():
+        raise ValueError("Nenhuma data válida na coluna 'date' após a normalização.")
+    if data['date'].isna().any():
+        logging.warning(f"{data['date'].isna().sum()} linhas sem data após a normalização")
+    data.to_csv(CONSOLIDATED_FILE, index=False, sep=';')
+
+
+def features_stage():
+    data = pd.read_csv(CONSOLIDATED_FILE, delimiter=';')
+    pd.to_pickle(regression_pipeline.prepare_features(data), FEATURES_FILE)
+
+
+def _model_results_file(model_name):
+    return os.path.join(CACHE_DIR, f'results_{model_name}.csv')
+
+
+def train_stage(model_name):
+    X, y, dates, codes = pd.read_pickle(FEATURES_FILE)
+    model = regression_pipeline.build_models()[model_name]
+    results = regression_pipeline.train_and_evaluate_models(X, y, {model_name: model}, dates, codes)
+    results.to_csv(_model_results_file(model_name), index=False)
+
+
+def results_stage():
+    model_names = list(regression_pipeline.build_models())
+    results = pd.concat([pd.read_csv(_model_results_file(name)) for name in model_names],
+                        ignore_index=True)
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    results.to_csv(RESULTS_FILE, index=False)
+    logging.info(f"Resultados salvos em: {RESULTS_FILE}")
+
+
+def build_dag(skip_download=False):
+    stages = []
+    if not skip_download:
+        # O download depende apenas do dia e da lista de índices/visões:
+        # roda no máximo uma vez por dia
+        stages.append(Stage('download', download_stage,
+                            code=['app.py', 'data_pipeline/B3_scrapping.py'],
+                            outputs=[DATA_DIR],
+                            params={'date': date.today(), 'indices': B3_scrapping.INDICES,
+                                    'views': B3_scrapping.VIEWS}))
+        stages.append(Stage('upload', upload_stage, deps=['download'], code=['app.py'],
+                            inputs=[os.path.join(STAGING_DIR, '*', '*', '*', '*.csv')]))
+
+    stages.append(Stage('normalize', normalize_stage,
+                        deps=[] if skip_download else ['download'],
+                        inputs=[os.path.join(TRAINING_DIR, '*.csv')],
+                        outputs=[CONSOLIDATED_FILE],
+                        code=['data_pipeline/pipeline_util.py']))
+    stages.append(Stage('features', features_stage, deps=['normalize'],
+                        inputs=[CONSOLIDATED_FILE], outputs=[FEATURES_FILE],
+                        code=['machine_learning/regression_pipeline.py']))
+
+    model_names = list(regression_pipeline.build_models())
+    for model_name in model_names:
+        stages.append(Stage(f'train_{model_name}', train_stage, args=[model_name],
+                            deps=['features'], inputs=[FEATURES_FILE],
+                            outputs=[_model_results_file(model_name)],
+                            code=['machine_learning/regression_pipeline.py']))
+
+    stages.append(Stage('results', results_stage, deps=[f'train_{name}' for name in model_names],
+                        inputs=[_model_results_file(name) for name in model_names],
+                        outputs=[RESULTS_FILE]))
+    return stages
+
+
+def _check_dag(stages):
+    """Falha antes de executar qualquer etapa se houver dependência circular ou inexistente."""
+    remaining = {stage.name: stage for stage in stages}
+    done = set()
+    while remaining:
+        ready = [name for name, stage in remaining.items() if all(dep in done for dep in stage.deps)]
+        if not ready:
+            raise ValueError(f"Dependência circular ou inexistente entre: {list(remaining)}")
+        for name in ready:
+            done.add(name)
+            del remaining[name]
+
+
+def _load_state():
+    """Estado por etapa: fingerprint e horário da última execução bem-sucedida."""
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, encoding='utf-8') as f:
+        state = json.load(f)
+    # Arquivos antigos guardavam apenas o fingerprint
+    return {name: entry if isinstance(entry, dict) else {'fingerprint': entry, 'last_success': None}
+            for name, entry in state.items()}
+
+
+def _save_state(state):
+    tmp_path = STATE_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def run(stages, force=(), max_workers=MAX_WORKERS):
+    """Executa o DAG e retorna o status de cada etapa: ok, skipped, failed ou blocked.
+
+    Cada etapa é iniciada assim que as suas dependências terminam, sem esperar
+    por etapas independentes (ex.: o upload não atrasa o treino).
+    """
+    _check_dag(stages)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    state = _load_state()
+    state_lock = threading.Lock()
+    status = {}
+
+    def execute(stage):
+        if any(status.get(dep) in ('failed', 'blocked') for dep in stage.deps):
+            logging.warning(f"Etapa {stage.name} não executada: dependência falhou")
+            return 'blocked'
+
+        fingerprint = stage.fingerprint()
+        forced = 'all' in force or stage.name in force
+        previous = state.get(stage.name, {}).get('fingerprint')
+        if not forced and previous == fingerprint and stage.outputs_exist():
+            logging.info(f"Etapa {stage.name} sem alterações, pulando")
+            return 'skipped'
+
+        logging.info(f"Executando etapa {stage.name}")
+        try:
+            with Span(f'stage_{stage.name}'):
+                stage.func(*stage.args)
+        except Exception as e:
+            logging.exception(f"Erro na etapa {stage.name}: {e}")
+            return 'failed'
+
+        with state_lock:
+            state[stage.name] = {'fingerprint': fingerprint, 'last_success': time.time()}
+            _save_state(state)
+        return 'ok'
+
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for stage in [s for s in pending.values() if all(dep in status for dep in s.deps)]:
+                del pending[stage.name]
+                running[executor.submit(execute, stage)] = stage
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                status[running.pop(future).name] = future.result()
+
+    # Mesma ordem do DAG, não a ordem de término
+    status = {stage.name: status[stage.name] for stage in stages}
+    for name, result in status.items():
+        record_dag_status(name, result, state.get(name, {}).get('last_success'))
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Executa o pipeline completo: download, normalização, features, treino e resultados.')
+    parser.add_argument('--force', default='',
+                        help="Etapas a executar mesmo sem alterações, separadas por vírgula ('all' para todas)")
+    parser.add_argument('--skip-download', action='store_true',
+                        help='Usa apenas os arquivos já presentes em data_pipeline/bovespa/<INDICE>/<visao>')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    configure('orchestrator')
+    try:
+        stages = build_dag(skip_download=args.skip_download)
+        status = run(stages, force=[name for name in args.force.split(',') if name], max_workers=args.workers)
+    finally:
+        export_prometheus()
+
+    for name, result in status.items():
+        logging.info(f"{name}: {result}")
+    if any(result in ('failed', 'blocked') for result in status.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()